@@ -6,15 +6,18 @@ Runs every minute via Cloud Scheduler to check for new HRs
 import os
 import json
 import re
+import time
 import requests
 from datetime import datetime, timezone
 from datetime import timedelta
 import hashlib
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set
 from tenacity import (
     retry,
     stop_after_attempt,
-    wait_fixed,
+    wait_exponential,
+    wait_random,
     retry_if_exception_type,
     retry_if_exception,
 )
@@ -26,6 +29,23 @@ from google.cloud import firestore
 DISCORD_DINGERS_WEBHOOK_URL = os.environ.get("DISCORD_DINGERS_WEBHOOK_URL")
 FIRESTORE_COLLECTION = os.environ.get("FIRESTORE_COLLECTION", "videos")
 FIRESTORE_DATABASE = os.environ.get("FIRESTORE_DATABASE", "dingers")
+HIGHLIGHT_FETCH_WORKERS = 8
+DISCORD_POST_WORKERS = 4
+MAX_RETRY_AFTER = 10  # seconds; cap on Discord's Retry-After between attempts
+POSTED_TTL = timedelta(days=2)
+
+# Highlights known to be posted, kept across warm invocations to skip
+# Firestore reads. Maps "<date>/<doc_id>" to an expiry timestamp.
+_POSTED_CACHE: Dict[str, float] = {}
+_POSTED_CACHE_MAX_SIZE = 10000
+
+# Reused across invocations so webhook posts keep their connection open
+_SESSION = requests.Session()
+
+# Home run keywords in highlight titles/descriptions
+_HR_RE = re.compile(r"homer|home run|grand slam", re.IGNORECASE)
+# Trailing timestamp in highlight titles (e.g., "(02:34:56)")
+_TIMESTAMP_RE = re.compile(r"\s*\(\d{2}:\d{2}:\d{2}\)\s*$")
 
 
 def get_firestore_client():
@@ -33,49 +53,109 @@ def get_firestore_client():
     return firestore.Client(database=FIRESTORE_DATABASE)
 
 
-def _highlight_doc_id(highlight: Dict) -> str:
-    """Create stable doc ID from game_id + cleaned title.
+def _highlight_key(highlight: Dict) -> bytes:
+    """Create stable key from game_id + cleaned title.
 
     Video URLs change as MLB re-encodes highlights, so we use
     the game ID and title (with timestamp stripped) instead.
     """
-    title = re.sub(r"\s*\(\d{2}:\d{2}:\d{2}\)\s*$", "", highlight["title"]).strip()
-    key = f"{highlight['game_id']}:{title}"
-    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+    title = _TIMESTAMP_RE.sub("", highlight["title"]).strip()
+    return f"{highlight['game_id']}:{title}".encode("utf-8")
 
 
-def has_posted_highlight(client, date_str: str, highlight: Dict) -> bool:
-    """Check if a highlight was already posted for the given date."""
-    doc_ref = (
-        client.collection(FIRESTORE_COLLECTION)
-        .document(date_str)
-        .collection("videos")
-        .document(_highlight_doc_id(highlight))
-    )
-    return doc_ref.get().exists
+def _highlight_doc_id(highlight: Dict) -> str:
+    """Create stable doc ID for a highlight (no cryptographic strength needed)."""
+    return hashlib.blake2b(_highlight_key(highlight), digest_size=16).hexdigest()
 
 
-def mark_highlight_posted(client, date_str: str, highlight: Dict) -> None:
-    """Mark a highlight as posted with TTL for cleanup."""
-    expires_at = datetime.now(timezone.utc) + timedelta(days=2)
+def _legacy_highlight_doc_id(highlight: Dict) -> str:
+    """Doc ID used before switching to BLAKE2b.
+
+    Still checked on read so highlights posted under the old ID aren't
+    reposted; can be removed once those docs age out via the 2-day TTL.
+    """
+    return hashlib.sha256(_highlight_key(highlight)).hexdigest()
 
-    doc_ref = (
+
+def _highlight_doc_ref(client, date_str: str, doc_id: str):
+    """Get the Firestore document reference for a highlight doc ID on the given date."""
+    return (
         client.collection(FIRESTORE_COLLECTION)
         .document(date_str)
         .collection("videos")
-        .document(_highlight_doc_id(highlight))
-    )
-    doc_ref.set(
-        {
-            "video_url": highlight["video_url"],
-            "title": highlight.get("title"),
-            "description": highlight.get("description"),
-            "posted_at": firestore.SERVER_TIMESTAMP,
-            "expires_at": expires_at,
-        }
+        .document(doc_id)
     )
 
 
+def _remember_posted(date_str: str, doc_id: str) -> None:
+    """Record a posted highlight in the in-memory cache."""
+    now = time.time()
+    if len(_POSTED_CACHE) > _POSTED_CACHE_MAX_SIZE:
+        for key in [k for k, expiry in _POSTED_CACHE.items() if expiry <= now]:
+            del _POSTED_CACHE[key]
+    _POSTED_CACHE[f"{date_str}/{doc_id}"] = now + POSTED_TTL.total_seconds()
+
+
+def get_posted_highlight_ids(client, date_str: str, highlights: List[Dict]) -> Set[str]:
+    """Get doc IDs of highlights already posted for the given date.
+
+    Highlights in the in-memory cache are skipped; the rest are looked up
+    in a single batched get_all() call rather than one read per highlight,
+    projected to no fields. Both the current and legacy doc IDs are checked.
+    """
+    now = time.time()
+    posted_ids = set()
+    refs = {}
+    # Maps every looked-up doc ID (current or legacy) to the current doc ID
+    current_ids = {}
+    for highlight in highlights:
+        doc_id = _highlight_doc_id(highlight)
+        if _POSTED_CACHE.get(f"{date_str}/{doc_id}", 0) > now:
+            posted_ids.add(doc_id)
+            continue
+        for lookup_id in (doc_id, _legacy_highlight_doc_id(highlight)):
+            refs[lookup_id] = _highlight_doc_ref(client, date_str, lookup_id)
+            current_ids[lookup_id] = doc_id
+    if not refs:
+        return posted_ids
+
+    # Empty projection: only existence is needed, so skip the field bytes
+    for snapshot in client.get_all(list(refs.values()), field_paths=[]):
+        if snapshot.exists:
+            doc_id = current_ids[snapshot.id]
+            posted_ids.add(doc_id)
+            _remember_posted(date_str, doc_id)
+    return posted_ids
+
+
+def _posted_highlight_doc(highlight: Dict) -> Dict:
+    """Build the Firestore doc marking a highlight as posted, with TTL for cleanup."""
+    return {
+        "video_url": highlight["video_url"],
+        "title": highlight.get("title"),
+        "description": highlight.get("description"),
+        "posted_at": firestore.SERVER_TIMESTAMP,
+        "expires_at": datetime.now(timezone.utc) + POSTED_TTL,
+    }
+
+
+def mark_highlights_posted(client, date_str: str, highlights: List[Dict]) -> None:
+    """Mark highlights as posted in a single batched write."""
+    if not highlights:
+        return
+
+    batch = client.batch()
+    doc_ids = []
+    for highlight in highlights:
+        doc_id = _highlight_doc_id(highlight)
+        batch.set(_highlight_doc_ref(client, date_str, doc_id), _posted_highlight_doc(highlight))
+        doc_ids.append(doc_id)
+    batch.commit()
+
+    for doc_id in doc_ids:
+        _remember_posted(date_str, doc_id)
+
+
 def get_games_for_date(date_str: str = None) -> List[Dict]:
     """Fetch MLB games for a given date
 
@@ -96,7 +176,9 @@ def get_games_for_date(date_str: str = None) -> List[Dict]:
             {
                 "sportId": 1,  # MLB
                 "date": date_str,
-                "hydrate": "linescore,game(content(highlights))",
+                # Only the game ID and state are used; highlights are
+                # fetched per game via statsapi.game_highlights()
+                "fields": "dates,games,gamePk,status,abstractGameState",
             },
         )
 
@@ -146,14 +228,7 @@ def extract_hr_highlights(game_id: int) -> List[Dict]:
                 continue
 
             # Check if it's a home run highlight
-            title_lower = title.lower()
-            description_lower = description.lower()
-            combined = f"{title_lower} {description_lower}"
-            is_hr = (
-                "homer" in combined
-                or "home run" in combined
-                or "grand slam" in combined
-            )
+            is_hr = bool(_HR_RE.search(title) or _HR_RE.search(description))
 
             # Skip Statcast data visualizations (not actual HR videos)
             is_data_clip = "darkroom-clips.mlb.com" in video_url
@@ -177,14 +252,32 @@ def _should_retry_http_error(exception):
     """Check if HTTP error is retryable (429, 500, 502, 503, 504)"""
     if not isinstance(exception, requests.exceptions.HTTPError):
         return False
-    status_code = exception.response.status_code if exception.response else None
+    # Compare to None explicitly: a Response is falsy for 4xx/5xx statuses
+    status_code = exception.response.status_code if exception.response is not None else None
     retryable_status_codes = {429, 500, 502, 503, 504}
     return status_code in retryable_status_codes
 
 
+_backoff = wait_exponential(multiplier=0.5, max=5) + wait_random(0, 0.5)
+
+
+def _wait_for_retry(retry_state) -> float:
+    """Honor Discord's Retry-After header when present, else back off with jitter"""
+    wait = _backoff(retry_state)
+    exception = retry_state.outcome.exception()
+    response = getattr(exception, "response", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("Retry-After", 0))
+        except ValueError:
+            retry_after = 0
+        wait = max(wait, min(retry_after, MAX_RETRY_AFTER))
+    return wait
+
+
 @retry(
     stop=stop_after_attempt(3),  # 3 total attempts
-    wait=wait_fixed(0.5),  # 500ms delay between attempts
+    wait=_wait_for_retry,  # Retry-After or jittered exponential backoff
     retry=(
         retry_if_exception_type(requests.exceptions.ConnectionError)
         | retry_if_exception_type(requests.exceptions.Timeout)
@@ -199,9 +292,7 @@ def post_to_discord(highlight: Dict):
         return False
 
     # Clean title by removing timestamp pattern (e.g., "(02:34:56)")
-    clean_title = re.sub(
-        r"\s*\(\d{2}:\d{2}:\d{2}\)\s*$", "", highlight["title"]
-    ).strip()
+    clean_title = _TIMESTAMP_RE.sub("", highlight["title"]).strip()
 
     # Format post content
     content = (
@@ -210,10 +301,62 @@ def post_to_discord(highlight: Dict):
 
     payload = {"content": content}
 
-    response = requests.post(DISCORD_DINGERS_WEBHOOK_URL, json=payload)
+    response = _SESSION.post(DISCORD_DINGERS_WEBHOOK_URL, json=payload, timeout=5)
     response.raise_for_status()
 
 
+def _is_transient_error(exception) -> bool:
+    """Check if a Discord post failure may succeed on a later tick"""
+    return isinstance(
+        exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    ) or _should_retry_http_error(exception)
+
+
+def _post_game_highlights(game_highlights: List[Dict]) -> List[Dict]:
+    """Post one game's highlights in order, returning those that were posted.
+
+    Stops at the first transient failure so a later HR never lands in the
+    channel ahead of an earlier one; the rest are retried on the next tick.
+    A permanent failure (e.g. a 400) would block the game all day, so it is
+    logged and skipped instead.
+    """
+    posted = []
+    for highlight in game_highlights:
+        try:
+            post_to_discord(highlight)
+        except Exception as e:
+            print(f"Error posting to Discord: {e}")
+            if _is_transient_error(e):
+                break
+            continue
+        posted.append(highlight)
+    return posted
+
+
+def post_new_highlights(date_str: str, highlights: List[Dict]) -> None:
+    """Post highlights not yet posted for the given date and mark them posted."""
+    firestore_client = get_firestore_client()
+    posted_ids = get_posted_highlight_ids(firestore_client, date_str, highlights)
+
+    to_post_by_game: Dict[int, List[Dict]] = {}
+    for highlight in highlights:
+        doc_id = _highlight_doc_id(highlight)
+        if doc_id in posted_ids:
+            continue
+        to_post_by_game.setdefault(highlight["game_id"], []).append(highlight)
+        posted_ids.add(doc_id)
+
+    # Games post concurrently; each game's HRs post in order
+    with ThreadPoolExecutor(max_workers=DISCORD_POST_WORKERS) as executor:
+        results = executor.map(_post_game_highlights, to_post_by_game.values())
+        newly_posted = [highlight for posted in results for highlight in posted]
+
+    try:
+        mark_highlights_posted(firestore_client, date_str, newly_posted)
+    except Exception as e:
+        print(f"Error marking highlights posted: {e}")
+
+
 def main(_request):
     """
     Main Cloud Function Gen 2 entry point
@@ -227,31 +370,27 @@ def main(_request):
     games = get_todays_games()
     print(f"Found {len(games)} games today ({date_str})")
 
-    firestore_client = get_firestore_client()
-
-    # Check each game for HR highlights
-    for game in games:
-        game_status = game.get("status", {}).get("abstractGameState", "")
-
-        # Only check live or final games
-        if game_status not in ["Live", "Final"]:
-            continue
-
-        game_id = game.get("gamePk")
-        if not game_id:
-            continue
-
-        highlights = extract_hr_highlights(game_id)
-
-        for highlight in highlights:
-            if has_posted_highlight(firestore_client, date_str, highlight):
-                continue
-
-            try:
-                post_to_discord(highlight)
-                mark_highlight_posted(firestore_client, date_str, highlight)
-            except Exception as e:
-                print(f"Error posting to Discord: {e}")
+    # Only check live or final games
+    game_ids = [
+        game["gamePk"]
+        for game in games
+        if game.get("status", {}).get("abstractGameState", "") in ["Live", "Final"]
+        and game.get("gamePk")
+    ]
+
+    # Nothing to do overnight, off-season, or before first pitch
+    if not game_ids:
+        print("No live or final games")
+    else:
+        # Fetch HR highlights for all games concurrently
+        highlights = []
+        with ThreadPoolExecutor(max_workers=HIGHLIGHT_FETCH_WORKERS) as executor:
+            for game_highlights in executor.map(extract_hr_highlights, game_ids):
+                highlights.extend(game_highlights)
+
+        # Only touch Firestore when there are highlights to check
+        if highlights:
+            post_new_highlights(date_str, highlights)
 
     return {
         "statusCode": 200,
@@ -0,0 +1,54 @@
+"""
+Tests for posting a game's highlights to Discord in order
+"""
+
+import requests
+
+from dingers import main
+
+
+def _http_error(status_code: int) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(response=response)
+
+
+def _stub_post(monkeypatch, failures: dict) -> list:
+    """Replace post_to_discord, raising the given exception per title"""
+    attempted = []
+
+    def fake_post(highlight):
+        attempted.append(highlight["title"])
+        if highlight["title"] in failures:
+            raise failures[highlight["title"]]
+
+    monkeypatch.setattr(main, "post_to_discord", fake_post)
+    return attempted
+
+
+HIGHLIGHTS = [{"title": "HR 1"}, {"title": "HR 2"}, {"title": "HR 3"}]
+
+
+def test_permanent_failure_is_skipped(monkeypatch):
+    attempted = _stub_post(monkeypatch, {"HR 1": _http_error(400)})
+
+    posted = main._post_game_highlights(HIGHLIGHTS)
+
+    assert attempted == ["HR 1", "HR 2", "HR 3"]
+    assert [h["title"] for h in posted] == ["HR 2", "HR 3"]
+
+
+def test_transient_failure_stops_the_sequence(monkeypatch):
+    attempted = _stub_post(monkeypatch, {"HR 2": _http_error(503)})
+
+    posted = main._post_game_highlights(HIGHLIGHTS)
+
+    assert attempted == ["HR 1", "HR 2"]
+    assert [h["title"] for h in posted] == ["HR 1"]
+
+
+def test_connection_error_stops_the_sequence(monkeypatch):
+    attempted = _stub_post(monkeypatch, {"HR 1": requests.exceptions.ConnectionError()})
+
+    assert main._post_game_highlights(HIGHLIGHTS) == []
+    assert attempted == ["HR 1"]
@@ -3,14 +3,15 @@ Email processing module for Fantrax transaction emails
 """
 
 import base64
-import json
+import functools
 import os
 import re
+from html import unescape
 
 import requests
-from bs4 import BeautifulSoup
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 # Transaction types
 CLAIM = "claim"
@@ -28,67 +29,119 @@ EMOJI = {
     DRAFT: "🍺",
 }
 
-LEAGUE_NAME = "The Don Orsillo Open"
+# Lowercase subject line markers for each transaction type, checked in order
+SUBJECT_MARKERS = (
+    ("player(s) claimed", CLAIM),
+    ("free agents added to pool", DROP),
+    ("trade executed", TRADE),
+    ("trade block changed", BLOCK),
+    ("draft pick made", DRAFT),
+)
 
+LEAGUE_NAME = "The Don Orsillo Open"
 
-def _get_gmail_service(gmail_credentials_json: str):
-    """Initialize Gmail API service from credentials JSON string"""
-    creds = Credentials.from_authorized_user_info(json.loads(gmail_credentials_json))
-    return build("gmail", "v1", credentials=creds)
+# Partial response for messages.get: only the fields we read when parsing
+_MESSAGE_FIELDS = "id,payload(mimeType,headers(name,value),body/data,parts(mimeType,body/data))"
+
+# Parsing patterns, compiled once at import
+# Fantrax emails share a fixed template, so plain regexes are enough to pull
+# the content element's text without building a DOM
+_CONTENT_RE = re.compile(
+    r'<(td|div)\b[^>]*\bclass="[^"]*\bdarkmode-text\b[^"]*"[^>]*>(.*?)</\1>',
+    re.DOTALL | re.IGNORECASE,
+)
+_STYLE_RE = re.compile(r"<(style|script)\b.*?</\1>", re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_BR_RE = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+_SPACES_RE = re.compile(r" +")
+_BLOCK_TEAM_RE = re.compile(r"- (.+?) has made changes to the Trade Block")
+_BLOCK_STATS_NEEDED_RE = re.compile(r"Stats Needed:(.*?)Comment:", re.DOTALL)
+_BLOCK_COMMENT_RE = re.compile(r"Comment:(.*?)(?:Note that|$)", re.DOTALL)
+_BLOCK_PLAYER_SPLIT_RE = re.compile(r"\n+|\s{2,}")
+_TRADE_DETAILS_RE = re.compile(r"has been executed\.\s*(.*?)Note that you can adjust", re.DOTALL)
+_TRADE_CLICK_HERE_RE = re.compile(r"You can click here to go to.*?\n")
+_CLAIM_BODY_RE = re.compile(r"were claimed.*?:\s*(.*?)\s*For more details", re.DOTALL)
+_CLAIM_PLAYER_LINE_RE = re.compile(r"\s+[A-Z]{2,3}\s*-\s*\w")
+_DROP_PLAYERS_RE = re.compile(
+    r"re-entered the\s+player pool as free agents.*?:\s*(.*?)(?:Note that|Thanks|$)",
+    re.DOTALL,
+)
+_DRAFT_PICK_RE = re.compile(
+    r"Round\s+(\d+)\s*,\s*Pick\s+(\d+)\s*:\s*(.+?)\s+was picked by the team\s+(.+?)\s*\.",
+    re.DOTALL,
+)
+
+# Gmail label IDs never change, so cache lookups by label name
+_LABEL_ID_CACHE: dict[str, str] = {}
+
+_SESSION = requests.Session()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_gmail_service(gmail_credentials: Credentials):
+    """Initialize Gmail API service from credentials.
+
+    Cached so warm invocations reuse the service instead of rebuilding it
+    from the discovery document on every request.
+    """
+    return build("gmail", "v1", credentials=gmail_credentials, cache_discovery=False, static_discovery=True)
 
 
 def _detect_transaction_type(subject: str) -> str:
     """Detect transaction type from email subject line"""
     subject = subject.lower()
-    if "player(s) claimed" in subject:
-        return CLAIM
-    elif "free agents added to pool" in subject:
-        return DROP
-    elif "trade executed" in subject:
-        return TRADE
-    elif "trade block changed" in subject:
-        return BLOCK
-    elif "draft pick made" in subject:
-        return DRAFT
-    return UNKNOWN
+    return next((t for marker, t in SUBJECT_MARKERS if marker in subject), UNKNOWN)
+
+
+def _decode_body(data: str) -> str:
+    """Decode a Gmail base64url body, tolerating missing padding and bad bytes"""
+    return base64.urlsafe_b64decode(data + "===").decode("utf-8", "replace")
 
 
 def _extract_html_body(message: dict) -> str | None:
-    """Extract HTML body from a Gmail message"""
+    """Extract and decode the HTML body from a Gmail message"""
     payload = message.get("payload", {})
 
     # Check if body is directly in payload
     if payload.get("mimeType") == "text/html":
         data = payload.get("body", {}).get("data", "")
         if data:
-            return base64.urlsafe_b64decode(data).decode("utf-8")
+            return _decode_body(data)
 
     # Check multipart parts
     for part in payload.get("parts", []):
         if part.get("mimeType") == "text/html":
             data = part.get("body", {}).get("data", "")
             if data:
-                return base64.urlsafe_b64decode(data).decode("utf-8")
+                return _decode_body(data)
 
     return None
 
 
-def _extract_text_content(html: str) -> str:
-    """Extract the main text content from Fantrax email HTML"""
-    soup = BeautifulSoup(html, "lxml")
+def _extract_text_content(html: str, separator: str = " ") -> str:
+    """Extract the main text content from Fantrax email HTML.
+
+    Text nodes are joined with ``separator``; trade emails use "" so that
+    inline tags don't add spacing to the trade details.
+    """
     # Fantrax puts the main content in a darkmode-text element (td or div)
-    content_div = soup.find(class_="darkmode-text")
-    if content_div:
-        # Replace <br> tags with newlines before getting text
-        for br in content_div.find_all("br"):
-            br.replace_with("\n")
-        return content_div.get_text(separator=" ").strip()
-    return soup.get_text(separator=" ").strip()
+    match = _CONTENT_RE.search(html)
+    content = match.group(2) if match else _STYLE_RE.sub("", html)
+    # <br> tags become newlines, any other tag becomes the separator
+    content = _TAG_RE.sub(separator, _BR_RE.sub("\n", content))
+    return unescape(content).strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _section_re(label: str, next_label: str) -> re.Pattern:
+    """Compile (once per label pair) the pattern for a trade block section"""
+    return re.compile(rf"{re.escape(label)}:(.*?){re.escape(next_label)}:", re.DOTALL)
 
 
 def _parse_trade_block(text: str) -> dict | None:
     """Parse trade block email text"""
-    team_match = re.search(r"- (.+?) has made changes to the Trade Block", text)
+    team_match = _BLOCK_TEAM_RE.search(text)
     if not team_match:
         return None
 
@@ -98,8 +151,7 @@ def _parse_trade_block(text: str) -> dict | None:
         team = team.rsplit(" - ", 1)[-1].strip()
 
     def extract_section(label: str, next_label: str) -> str:
-        pattern = rf"{re.escape(label)}:(.*?){re.escape(next_label)}:"
-        match = re.search(pattern, text, re.DOTALL)
+        match = _section_re(label, next_label).search(text)
         return match.group(1).strip() if match else ""
 
     players_raw = extract_section("Players Offered", "Positions Offered")
@@ -107,13 +159,13 @@ def _parse_trade_block(text: str) -> dict | None:
     stats_offered = extract_section("Stats Offered", "Positions Needed")
     positions_needed = extract_section("Positions Needed", "Stats Needed")
 
-    stats_needed_match = re.search(r"Stats Needed:(.*?)Comment:", text, re.DOTALL)
+    stats_needed_match = _BLOCK_STATS_NEEDED_RE.search(text)
     stats_needed = stats_needed_match.group(1).strip() if stats_needed_match else ""
 
-    comment_match = re.search(r"Comment:(.*?)(?:Note that|$)", text, re.DOTALL)
+    comment_match = _BLOCK_COMMENT_RE.search(text)
     comment = comment_match.group(1).strip() if comment_match else ""
 
-    players = [p.strip() for p in re.split(r"\n+|\s{2,}", players_raw) if p.strip()]
+    players = [p.strip() for p in _BLOCK_PLAYER_SPLIT_RE.split(players_raw) if p.strip()]
 
     return {
         "team": team,
@@ -126,23 +178,11 @@ def _parse_trade_block(text: str) -> dict | None:
     }
 
 
-def _parse_trade(html: str) -> dict | None:
-    """Parse trade email HTML"""
-    soup = BeautifulSoup(html, "lxml")
-    content_div = soup.find(class_="darkmode-text")
-    if not content_div:
-        return None
-
-    # Replace <br> tags with actual newlines before extracting text
-    for br in content_div.find_all("br"):
-        br.replace_with("\n")
-
-    # Extract text without adding separators between tags
-    full_text = content_div.get_text(separator="")
-
+def _parse_trade(text: str) -> dict | None:
+    """Parse trade email text (extracted without separators between tags)"""
     # Normalize whitespace: collapse multiple spaces on each line
-    lines = full_text.split("\n")
-    lines = [re.sub(r" +", " ", line.strip()) for line in lines]
+    lines = text.split("\n")
+    lines = [_SPACES_RE.sub(" ", line.strip()) for line in lines]
 
     # Collapse consecutive empty lines into one, but keep single blank lines
     result = []
@@ -157,17 +197,13 @@ def _parse_trade(html: str) -> dict | None:
             prev_empty = False
     full_text = "\n".join(result)
 
-    match = re.search(
-        r"has been executed\.\s*(.*?)Note that you can adjust",
-        full_text,
-        re.DOTALL,
-    )
+    match = _TRADE_DETAILS_RE.search(full_text)
     if not match:
         return None
 
     details = match.group(1).strip()
     # Clean up "click here" links
-    details = re.sub(r"You can click here to go to.*?\n", "", details).strip()
+    details = _TRADE_CLICK_HERE_RE.sub("", details).strip()
     return {"details": details}
 
 
@@ -178,11 +214,7 @@ def _parse_claim(text: str) -> dict | None:
     (ending after date/commissioner line) and "For more details".
     Supports multiple teams/players in a single claim email.
     """
-    match = re.search(
-        r"were claimed.*?:\s*(.*?)\s*For more details",
-        text,
-        re.DOTALL,
-    )
+    match = _CLAIM_BODY_RE.search(text)
     if not match:
         return {"raw": text}
 
@@ -195,7 +227,7 @@ def _parse_claim(text: str) -> dict | None:
     claims = []
     current_team = None
     for line in lines:
-        if re.search(r"\s+[A-Z]{2,3}\s*-\s*\w", line):
+        if _CLAIM_PLAYER_LINE_RE.search(line):
             # This is a player line (e.g. "Yoshinobu Yamamoto LAD - P")
             if current_team:
                 claims.append({"team": current_team, "player": line})
@@ -209,11 +241,7 @@ def _parse_claim(text: str) -> dict | None:
 
 def _parse_drop(text: str) -> dict | None:
     """Parse drop/free agent email text"""
-    match = re.search(
-        r"re-entered the\s+player pool as free agents.*?:\s*(.*?)(?:Note that|Thanks|$)",
-        text,
-        re.DOTALL,
-    )
+    match = _DROP_PLAYERS_RE.search(text)
     if match:
         players = [p.strip() for p in match.group(1).strip().split("\n") if p.strip()]
         return {"players": players}
@@ -222,17 +250,13 @@ def _parse_drop(text: str) -> dict | None:
 
 def _parse_draft(text: str) -> dict | None:
     """Parse draft pick email text"""
-    match = re.search(
-        r"Round\s+(\d+)\s*,\s*Pick\s+(\d+)\s*:\s*(.+?)\s+was picked by the team\s+(.+?)\s*\.",
-        text,
-        re.DOTALL,
-    )
+    match = _DRAFT_PICK_RE.search(text)
     if match:
         return {
-            "round": re.sub(r"\s+", " ", match.group(1).strip()),
-            "pick": re.sub(r"\s+", " ", match.group(2).strip()),
-            "player": re.sub(r"\s+", " ", match.group(3).strip()),
-            "team": re.sub(r"\s+", " ", match.group(4).strip()),
+            "round": _WHITESPACE_RE.sub(" ", match.group(1).strip()),
+            "pick": _WHITESPACE_RE.sub(" ", match.group(2).strip()),
+            "player": _WHITESPACE_RE.sub(" ", match.group(3).strip()),
+            "team": _WHITESPACE_RE.sub(" ", match.group(4).strip()),
         }
     return {"raw": text}
 
@@ -293,27 +317,80 @@ def _format_discord_message(transaction_type: str, data: dict) -> str:
 
 def _post_to_discord(webhook_url: str, message: str) -> None:
     """Post a message to a Discord webhook"""
-    response = requests.post(webhook_url, json={"content": message})
+    response = _SESSION.post(webhook_url, json={"content": message}, timeout=5)
     response.raise_for_status()
 
 
 def _get_label_id(service, label_name: str) -> str | None:
-    """Get Gmail label ID by name"""
+    """Get Gmail label ID by name (cached across warm invocations)"""
+    if label_name in _LABEL_ID_CACHE:
+        return _LABEL_ID_CACHE[label_name]
+
     labels = service.users().labels().list(userId="me").execute()
-    return next(
+    label_id = next(
         (l["id"] for l in labels.get("labels", []) if l["name"] == label_name),
         None,
     )
+    if label_id:
+        _LABEL_ID_CACHE[label_name] = label_id
+    return label_id
 
 
-def _process_single_message(service, msg_id: str, discord_transactions_url: str, discord_trade_block_url: str) -> dict | None:
-    """Fetch, parse, and post a single Gmail message. Returns result dict or None if skipped."""
-    message = (
-        service.users()
-        .messages()
-        .get(userId="me", id=msg_id, format="full")
-        .execute()
-    )
+def _fetch_messages(service, msg_ids: list[str]) -> dict:
+    """Fetch Gmail messages in a single batch HTTP request.
+
+    Returns a dict mapping each message ID to its message, or to the
+    exception raised while fetching it.
+    """
+    results = {}
+
+    def on_get(request_id, response, exception):
+        results[request_id] = exception if exception is not None else response
+
+    batch = service.new_batch_http_request(callback=on_get)
+    for msg_id in msg_ids:
+        batch.add(
+            service.users().messages().get(userId="me", id=msg_id, format="full", fields=_MESSAGE_FIELDS),
+            request_id=msg_id,
+        )
+    batch.execute()
+    return results
+
+
+def _is_transient_fetch_error(exception: Exception) -> bool:
+    """Check if a batch get failure may succeed on the next notification"""
+    return isinstance(exception, HttpError) and exception.resp.status in {429, 500, 502, 503, 504}
+
+
+def _archive_messages(service, msg_ids: list[str]) -> None:
+    """Archive Gmail messages (remove from INBOX) in a single request.
+
+    batchModify is all-or-nothing, so if it fails each message is archived on
+    its own and one bad ID can't leave the rest in INBOX to be posted again.
+    """
+    try:
+        service.users().messages().batchModify(
+            userId="me",
+            body={"ids": msg_ids, "removeLabelIds": ["INBOX"]},
+        ).execute()
+        return
+    except Exception as e:
+        print(f"Failed to batch archive messages, archiving one at a time: {e}")
+
+    for msg_id in msg_ids:
+        try:
+            service.users().messages().modify(
+                userId="me",
+                id=msg_id,
+                body={"removeLabelIds": ["INBOX"]},
+            ).execute()
+        except Exception as e:
+            print(f"Failed to archive message {msg_id}: {e}")
+
+
+def _process_single_message(message: dict, discord_transactions_url: str, discord_trade_block_url: str) -> dict | None:
+    """Parse and post a single Gmail message. Returns result dict or None if skipped."""
+    msg_id = message["id"]
 
     # Extract subject from headers
     headers = message.get("payload", {}).get("headers", [])
@@ -333,20 +410,17 @@ def _process_single_message(service, msg_id: str, discord_transactions_url: str,
         print(f"No HTML body found for message {msg_id}")
         return None
 
-    # Parse based on type
+    # Extract text once, then parse based on type
+    text = _extract_text_content(html_body, separator="" if transaction_type == TRADE else " ")
     if transaction_type == BLOCK:
-        text = _extract_text_content(html_body)
         data = _parse_trade_block(text)
     elif transaction_type == TRADE:
-        data = _parse_trade(html_body)
+        data = _parse_trade(text)
     elif transaction_type == CLAIM:
-        text = _extract_text_content(html_body)
         data = _parse_claim(text)
     elif transaction_type == DROP:
-        text = _extract_text_content(html_body)
         data = _parse_drop(text)
     elif transaction_type == DRAFT:
-        text = _extract_text_content(html_body)
         data = _parse_draft(text)
     else:
         data = None
@@ -365,7 +439,7 @@ def _process_single_message(service, msg_id: str, discord_transactions_url: str,
         return None
 
 
-def process_email(message_data: dict, gmail_credentials_json: str, gcp_project_id: str) -> dict:
+def process_email(message_data: dict, gmail_credentials: Credentials, gcp_project_id: str) -> dict:
     """
     Process a Pub/Sub message containing a Gmail notification.
 
@@ -375,7 +449,7 @@ def process_email(message_data: dict, gmail_credentials_json: str, gcp_project_i
 
     Args:
         message_data: The Pub/Sub message data (decoded) — contains emailAddress and historyId
-        gmail_credentials_json: Gmail API credentials as JSON string
+        gmail_credentials: Gmail API OAuth credentials
         gcp_project_id: GCP project ID
 
     Returns:
@@ -386,7 +460,7 @@ def process_email(message_data: dict, gmail_credentials_json: str, gcp_project_i
 
     print(f"Processing Gmail notification: {message_data}")
 
-    service = _get_gmail_service(gmail_credentials_json)
+    service = _get_gmail_service(gmail_credentials)
 
     # Find the DOO Transaction label ID
     label_id = _get_label_id(service, "DOO Transaction")
@@ -399,7 +473,7 @@ def process_email(message_data: dict, gmail_credentials_json: str, gcp_project_i
         list_response = (
             service.users()
             .messages()
-            .list(userId="me", labelIds=[label_id, "INBOX"], maxResults=50)
+            .list(userId="me", labelIds=[label_id, "INBOX"], maxResults=50, fields="messages/id")
             .execute()
         )
     except Exception as e:
@@ -413,29 +487,36 @@ def process_email(message_data: dict, gmail_credentials_json: str, gcp_project_i
 
     print(f"Found {len(messages)} unarchived DOO Transaction message(s)")
 
+    msg_ids = [msg_stub["id"] for msg_stub in messages]
+    try:
+        fetched = _fetch_messages(service, msg_ids)
+    except Exception as e:
+        print(f"Failed to fetch Gmail messages: {e}")
+        return {"status": "error", "reason": str(e)}
+
     processed = []
-    for msg_stub in messages:
-        msg_id = msg_stub["id"]
-        try:
-            result = _process_single_message(service, msg_id, discord_transactions_url, discord_trade_block_url)
-            if result:
-                processed.append(result)
-            # Always archive so we don't reprocess on next notification
-            service.users().messages().modify(
-                userId="me",
-                id=msg_id,
-                body={"removeLabelIds": ["INBOX"]},
-            ).execute()
-        except Exception as e:
-            print(f"Failed to process message {msg_id}: {e}")
-            # Still archive to avoid infinite retry on broken emails
+    to_archive = []
+    try:
+        for msg_id in msg_ids:
+            message = fetched.get(msg_id)
+            if isinstance(message, Exception) and _is_transient_fetch_error(message):
+                # Leave it in INBOX so the next notification picks it up
+                print(f"Transient error fetching message {msg_id}: {message}")
+                continue
+            to_archive.append(msg_id)
             try:
-                service.users().messages().modify(
-                    userId="me",
-                    id=msg_id,
-                    body={"removeLabelIds": ["INBOX"]},
-                ).execute()
-            except Exception:
-                pass
+                if isinstance(message, Exception):
+                    raise message
+                if message is None:
+                    raise ValueError("no response in batch")
+                result = _process_single_message(message, discord_transactions_url, discord_trade_block_url)
+                if result:
+                    processed.append(result)
+            except Exception as e:
+                print(f"Failed to process message {msg_id}: {e}")
+    finally:
+        # Always archive, even broken emails, so we don't reprocess on next notification
+        if to_archive:
+            _archive_messages(service, to_archive)
 
     return {"status": "ok", "processed": processed}
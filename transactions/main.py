@@ -5,12 +5,19 @@ Also handles daily Gmail watch renewal via Cloud Scheduler
 """
 
 import base64
-import json
+import functools
+import logging
 import os
 
+import orjson
+from google.oauth2.credentials import Credentials
+
 from .gmail_watch import renew_gmail_watch
 from .email import process_email
 
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
 # Configuration
 GCP_PROJECT_ID = os.environ.get("GCP_PROJECT_ID")
 GMAIL_CREDENTIALS_JSON = os.environ.get("GMAIL_CREDENTIALS_JSON")
@@ -18,47 +25,93 @@ DISCORD_TRANSACTIONS_WEBHOOK_URL = os.environ.get("DISCORD_TRANSACTIONS_WEBHOOK_
 DISCORD_TRADE_BLOCK_WEBHOOK_URL = os.environ.get("DISCORD_TRADE_BLOCK_WEBHOOK_URL")
 
 
+# Constant responses, serialized once at import
+_INVALID_REQUEST = (orjson.dumps({"error": "Invalid request format"}), 400)
+_OK_EMPTY = (orjson.dumps({"status": "ok"}), 200)
+
+
+@functools.lru_cache(maxsize=1)
+def _gmail_credentials(credentials_json: str) -> Credentials:
+    """Parse the Gmail OAuth credentials once per instance, not per request"""
+    return Credentials.from_authorized_user_info(orjson.loads(credentials_json))
+
+
+def _ok(**fields):
+    """Build a 200 response with status "ok" plus the given fields"""
+    return (orjson.dumps({"status": "ok", **fields}), 200)
+
+
+def _handle_renew_watch():
+    """Renew the Gmail watch subscription (Cloud Scheduler route)"""
+    try:
+        gmail_credentials = _gmail_credentials(GMAIL_CREDENTIALS_JSON)
+        response = renew_gmail_watch(gmail_credentials, GCP_PROJECT_ID)
+        expiration = response.get("expiration")
+        log.info("Gmail watch renewed. Expiration: %s", expiration)
+        return _ok(expiration=expiration)
+    except Exception as e:
+        log.exception("Gmail watch renewal failed")
+        return (orjson.dumps({"error": str(e)}), 500)
+
+
+def _handle_pubsub(pubsub_messages: list[dict]):
+    """Process one or more Gmail notifications delivered by Pub/Sub.
+
+    process_email handles every unarchived transaction email regardless of
+    which notification triggered it, so a batch needs only one pass. The
+    latest notification that carries data is passed along for logging. A
+    batch in which no message has data or attributes is acknowledged as-is.
+    """
+    try:
+        # Decode the latest Pub/Sub message that carries data
+        message_data = {}
+        for pubsub_message in reversed(pubsub_messages):
+            decoded_data = base64.b64decode(pubsub_message.get("data") or b"")
+            if decoded_data:
+                message_data = orjson.loads(decoded_data)
+                break
+        else:
+            if not any(m.get("attributes") for m in pubsub_messages):
+                # Nothing from Gmail to act on; acknowledge without touching the inbox
+                return _OK_EMPTY
+
+        gmail_credentials = _gmail_credentials(GMAIL_CREDENTIALS_JSON)
+        result = process_email(message_data, gmail_credentials, GCP_PROJECT_ID)
+        return _ok(result=result)
+    except Exception as e:
+        # Return 200 so Pub/Sub acknowledges the message and stops retrying.
+        # Errors are logged for debugging.
+        log.exception("Email processing failed")
+        return (orjson.dumps({"status": "error", "error": str(e)}), 200)
+
+
 def main(request):
     """
     Cloud Run entry point that handles both:
     1. Gmail watch renewal from Cloud Scheduler (POST with {"action": "renew_watch"})
-    2. Email notifications from Pub/Sub (POST with {"message": {...}})
+    2. Email notifications from Pub/Sub (POST with {"message": {...}}
+       or a batch as {"messages": [{...}, ...]})
     """
-    request_json = request.get_json(silent=True)
+    # Pub/Sub and Cloud Scheduler both send JSON, so parse the raw body directly
+    try:
+        request_json = orjson.loads(request.get_data(cache=False)) or {}
+    except orjson.JSONDecodeError:
+        request_json = {}
 
     # Route 1: Watch renewal from Cloud Scheduler
-    if request_json and request_json.get("action") == "renew_watch":
-        try:
-            response = renew_gmail_watch(GMAIL_CREDENTIALS_JSON, GCP_PROJECT_ID)
-            print(f"Gmail watch renewed. Expiration: {response.get('expiration')}")
-            return (json.dumps({"status": "ok", "expiration": response.get("expiration")}), 200)
-        except Exception as e:
-            print(f"Gmail watch renewal failed: {e}")
-            return (json.dumps({"error": str(e)}), 500)
+    if request_json.get("action") == "renew_watch":
+        return _handle_renew_watch()
 
     # Route 2: Email notification from Pub/Sub
-    if request_json and "message" in request_json:
-        try:
-            # Decode Pub/Sub message
-            pubsub_message = request_json["message"]
-            message_data = {}
-
-            if "data" in pubsub_message:
-                decoded_data = base64.b64decode(pubsub_message["data"]).decode("utf-8")
-                message_data = json.loads(decoded_data) if decoded_data else {}
-
-            result = process_email(message_data, GMAIL_CREDENTIALS_JSON, GCP_PROJECT_ID)
-            return (json.dumps({"status": "ok", "result": result}), 200)
-        except Exception as e:
-            # Return 200 so Pub/Sub acknowledges the message and stops retrying.
-            # Errors are logged for debugging.
-            print(f"Email processing failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return (json.dumps({"status": "error", "error": str(e)}), 200)
+    pubsub_message = request_json.get("message")
+    if pubsub_message is not None:
+        return _handle_pubsub([pubsub_message])
+    pubsub_messages = request_json.get("messages")
+    if pubsub_messages:
+        return _handle_pubsub(pubsub_messages)
 
     # Unknown request type
-    return (json.dumps({"error": "Invalid request format"}), 400)
+    return _INVALID_REQUEST
 
 
 if __name__ == "__main__":
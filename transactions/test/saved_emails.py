@@ -0,0 +1,29 @@
+"""
+Loaders for the saved Fantrax emails used by the parsing tests
+"""
+
+import email
+import functools
+from email import policy
+from pathlib import Path
+
+EMAILS_DIR = Path(__file__).parent / "emails"
+
+
+@functools.lru_cache(maxsize=None)
+def _load_message(name: str) -> email.message.EmailMessage:
+    """Parse a saved .eml file from the emails directory (once per session)"""
+    with open(EMAILS_DIR / name, "rb") as f:
+        return email.message_from_binary_file(f, policy=policy.default)
+
+
+def load_email_subject(name: str) -> str:
+    """Load the decoded subject line of a saved .eml file"""
+    return _load_message(name)["subject"]
+
+
+def load_email_html(name: str) -> str:
+    """Load the HTML content of a saved .eml file from the emails directory"""
+    msg = _load_message(name)
+    html_part = msg.get_body(preferencelist=("html",))
+    return html_part.get_content() if html_part else msg.get_content()
@@ -0,0 +1,42 @@
+"""
+Tests for archiving processed Gmail messages
+"""
+
+from unittest.mock import MagicMock
+
+import httplib2
+from googleapiclient.errors import HttpError
+from transactions.email import _archive_messages, _is_transient_fetch_error
+
+
+def _http_error(status: int) -> HttpError:
+    return HttpError(httplib2.Response({"status": status}), b"")
+
+
+def test_archive_uses_one_batch_request():
+    service = MagicMock()
+
+    _archive_messages(service, ["a", "b"])
+
+    messages = service.users().messages()
+    messages.batchModify.assert_called_once_with(userId="me", body={"ids": ["a", "b"], "removeLabelIds": ["INBOX"]})
+    messages.modify.assert_not_called()
+
+
+def test_archive_falls_back_to_each_message():
+    service = MagicMock()
+    messages = service.users().messages()
+    messages.batchModify.return_value.execute.side_effect = _http_error(400)
+    # The first message was deleted; the second must still be archived
+    messages.modify.return_value.execute.side_effect = [_http_error(404), {}]
+
+    _archive_messages(service, ["gone", "b"])
+
+    assert [call.kwargs["id"] for call in messages.modify.call_args_list] == ["gone", "b"]
+
+
+def test_transient_fetch_errors():
+    assert _is_transient_fetch_error(_http_error(429))
+    assert _is_transient_fetch_error(_http_error(503))
+    assert not _is_transient_fetch_error(_http_error(404))
+    assert not _is_transient_fetch_error(ValueError("no response in batch"))
@@ -0,0 +1,181 @@
+"""
+Tests for parsing the saved Fantrax emails end to end
+"""
+
+import pytest
+from transactions.email import (
+    BLOCK,
+    CLAIM,
+    DRAFT,
+    DROP,
+    TRADE,
+    UNKNOWN,
+    _detect_transaction_type,
+    _extract_text_content,
+    _parse_claim,
+    _parse_draft,
+    _parse_drop,
+    _parse_trade,
+    _parse_trade_block,
+)
+from transactions.test.saved_emails import EMAILS_DIR, load_email_html, load_email_subject
+
+# To test with your actual emails:
+# 1. Save the Fantrax email as an .eml file in transactions/test/emails/
+# 2. Add its expected fields to EXPECTED below
+# 3. Run: uv run pytest transactions/test -v
+
+PARSERS = {
+    CLAIM: _parse_claim,
+    TRADE: _parse_trade,
+    BLOCK: _parse_trade_block,
+    DRAFT: _parse_draft,
+}
+
+EXPECTED = {
+    "claim-1.eml": (
+        CLAIM,
+        {"claims": [{"team": "Grand Salamis", "player": "Yoshinobu Yamamoto LAD - P"}]},
+    ),
+    "draft-1.eml": (
+        DRAFT,
+        {"round": "1", "pick": "1", "player": "Nolan McLean", "team": "Joey's Team"},
+    ),
+    "draft-2.eml": (
+        DRAFT,
+        {"round": "1", "pick": "2", "player": "Cam Schlittler", "team": "Murph Dawgs"},
+    ),
+    "trade-1.eml": (
+        TRADE,
+        {
+            "details": (
+                "Big Bodies trades away\n"
+                "2026 Draft Pick, Round 2 Pick 14\n"
+                "Vinnie Pasquantino\n"
+                "\n"
+                "James Wood's Young Prospects trades away\n"
+                "Elly De La Cruz\n"
+                "2026 Draft Pick, Round 5 Pick 6"
+            )
+        },
+    ),
+    "trade-2.eml": (
+        TRADE,
+        {
+            "details": (
+                "Rangoon City Crabbers trades away\n"
+                "2026 Draft Pick, Round 5 Pick 3\n"
+                "Pete Fairbanks\n"
+                "\n"
+                "GriMets trades away\n"
+                "2026 Draft Pick, Round 3 Pick 10"
+            )
+        },
+    ),
+    "trade-3.eml": (
+        TRADE,
+        {
+            "details": (
+                "Mi Casas Su Casas trades away\n"
+                "2026 Draft Pick, Round 2 Pick 12\n"
+                "2026 Draft Pick, Round 5 Pick 12\n"
+                "\n"
+                "Reàl Mark Davis B.C. trades away\n"
+                "2026 Draft Pick, Round 1 Pick 14"
+            )
+        },
+    ),
+    "trade-block-1.eml": (
+        BLOCK,
+        {
+            "team": "Grand Salamis",
+            "players_offered": [
+                "Contreras, Willson",
+                "Turner, Trea",
+                "Smith, Cam",
+                "Wallner, Matt",
+                "Miller, Bryce",
+                "Pfaadt, Brandon",
+            ],
+            "positions_offered": "(None specified)",
+            "stats_offered": "(None specified)",
+            "positions_needed": "(None specified)",
+            "stats_needed": "(None specified)",
+            "comment": "",
+        },
+    ),
+    "trade-block-2.eml": (
+        BLOCK,
+        {
+            "team": "Under Construction",
+            "players_offered": [
+                "Gelof, Zack",
+                "Norby, Connor",
+                "Thomas, Lane",
+                "Carpenter, Kerry",
+                "Walker, Jordan",
+                "Priester, Quinn",
+                "Brash, Matt",
+                "Fairbanks, Pete",
+                "Myers, Tobias",
+            ],
+            "positions_offered": "3B, CI, OF, P",
+            "stats_offered": "(None specified)",
+            "positions_needed": "OF, P",
+            "stats_needed": "(None specified)",
+            "comment": "Looking for extra picks, not just ‘26 but ‘27",
+        },
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(p.name for p in EMAILS_DIR.glob("*.eml")))
+def test_parse_saved_email(name):
+    """Each saved email is classified and parsed into its key fields"""
+    expected_type, expected_data = EXPECTED[name]
+
+    transaction_type = _detect_transaction_type(load_email_subject(name))
+    assert transaction_type == expected_type
+
+    separator = "" if transaction_type == TRADE else " "
+    text = _extract_text_content(load_email_html(name), separator=separator)
+    assert PARSERS[transaction_type](text) == expected_data
+
+
+@pytest.mark.parametrize(
+    "subject, expected_type",
+    [
+        ("Trade Block Changed - Player(s) Claimed", CLAIM),
+        ("Draft Pick Made after Trade Executed", TRADE),
+        ("Weekly league recap", UNKNOWN),
+    ],
+)
+def test_detect_transaction_type_priority(subject, expected_type):
+    """Subjects with several markers take the highest-priority type"""
+    assert _detect_transaction_type(subject) == expected_type
+
+
+# No drop email has been saved yet, so this follows the same Fantrax template
+SAMPLE_DROP_HTML = """
+<html>
+<head><style>.darkmode-text div { color: #ffffff; }</style></head>
+<body>
+<table><tr>
+<td class="darkmode-text" style="font-size: 0px; padding: 10px;"><div style="font-size: 14px;">
+The following players have re-entered the<br>player pool as free agents in The Don Orsillo Open:<br><br>
+Pete Fairbanks MIA - RP<br>
+Jos&eacute; Ram&iacute;rez CLE - 3B<br><br>
+Note that you can adjust your email notification settings.
+</div></td>
+</tr></table>
+</body>
+</html>
+"""
+
+
+def test_parse_drop():
+    """Drop emails list each player returned to the pool"""
+    assert _detect_transaction_type("Free Agents Added to Pool - The Don Orsillo Open") == DROP
+
+    text = _extract_text_content(SAMPLE_DROP_HTML)
+    assert _parse_drop(text) == {"players": ["Pete Fairbanks MIA - RP", "José Ramírez CLE - 3B"]}